@@ -11,6 +11,11 @@ def measurementFunc(x, timeStep=0.004):
     end = int(2.0 / timeStep)
     return np.mean(x[start:end])
 
+# Probe tones are normalised to the requested RMS level in dB SPL
+tone = ln.tools.iterators.makeProbeTone(1000.0, 32000, 1, 40.0)
+level = 20 * np.log10(np.sqrt(np.mean(tone ** 2)) / 2e-5)
+assert np.abs(level - 40.0) < 1e-9
+
 model = ln.DynamicLoudnessGM2002()
 model.setHPFUsed(True)
 model.setRate(1 / 0.004)
@@ -0,0 +1,27 @@
+import loudness as ln
+import numpy as np
+
+
+def soneToPhon(x):
+    return ln.soneToPhonMGB1997(float(x), True)
+
+fs = 32000
+
+model = ln.DynamicLoudnessGM2002()
+model.setRate(500)
+model.setFilterSpacingInCams(0.75)
+
+predictor = ln.tools.iterators.DynamicLoudnessISOThresholdPredictor(
+    model, fs, 'LongTermLoudness', None, soneToPhon)
+predictor.tol = 0.1
+predictor.nIters = 5
+
+# Solving in worker processes should match solving sequentially
+predictor.nJobs = 4
+predictor.process()
+parallel = predictor.predictions.copy()
+predictor.nJobs = 1
+predictor.process()
+print('Max abs difference between parallel and sequential: %0.3g' %
+      np.max(np.abs(parallel - predictor.predictions)))
+assert np.array_equal(parallel, predictor.predictions)
@@ -25,3 +25,7 @@ signal = np.sin(2 * np.pi * 100.0 * np.arange(0, 1 * fs) / float(fs))
 
 targetLoudness = signal * 0.5
 iterator.process(signal, targetLoudness)
+
+# The default global loudness feature averages the middle half of the frames
+frames = np.arange(8.0).reshape((-1, 1))
+assert ln.tools.iterators.steadyStateMean(frames) == 3.5
@@ -0,0 +1,27 @@
+import loudness as ln
+import numpy as np
+
+
+def func(x):
+    return ln.soneToPhonMGB1997(float(x), True)
+
+model = ln.StationaryLoudnessANSIS342007()
+predictor = ln.tools.iterators.StationaryLoudnessISOThresholdPredictor(
+    model, 'InstantaneousLoudness', func)
+predictor.process()
+print(predictor.iterator.convergedBatch)
+
+# The batched solve should match solving each probe in turn
+sequential = np.zeros(predictor.freqsISO.size)
+for i in range(predictor.freqsISO.size):
+    sequential[i] = predictor.thresholdsISO[i] + predictor.iterator.process(
+        predictor.freqsISO,
+        predictor.probeLevels[i],
+        None,
+        predictor.threshold,
+        predictor.tol,
+        predictor.nIters
+    )
+print('Max abs difference between batched and sequential: %0.3g' %
+      np.max(np.abs(predictor.predictions - sequential)))
+assert np.array_equal(predictor.predictions, sequential)
@@ -1,4 +1,4 @@
-import sound
-import extractors
-import iterators
-import predictors
+from . import sound
+from . import extractors
+from . import iterators
+from . import predictors
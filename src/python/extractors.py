@@ -1,8 +1,8 @@
+from __future__ import print_function
 import os
 import pickle
 import numpy as np
 import loudness as ln
-import matplotlib.pyplot as plt
 import h5py
 
 
@@ -65,6 +65,26 @@ class StationaryLoudnessExtractor:
 
         self.model.reset()
 
+    def processBatch(self, frequencies, intensityLevels):
+        '''
+        Convenience wrapper that runs process() on each row of
+        `intensityLevels' (the component levels of one single ear stimulus)
+        and stacks the outputs along the first axis, one row per stimulus.
+        The model still processes one stimulus per call; it is only
+        reinitialised if the component frequencies change, which they do not
+        within a batch.
+        '''
+        intensityLevels = np.atleast_2d(intensityLevels)
+        batch = dict((name, []) for name in self.outputs)
+        for levels in intensityLevels:
+            self.process(frequencies, levels)
+            for name in self.outputs:
+                batch[name].append(self.outputDict[name])
+
+        self.outputDict['IntensityLevels'] = intensityLevels
+        for name in self.outputs:
+            self.outputDict[name] = np.array(batch[name])
+
 
 class DynamicLoudnessExtractor:
     '''Convienience class for processing numpy arrays.
@@ -127,6 +147,8 @@ class DynamicLoudnessExtractor:
         self.nSamplesToPadEnd = int(0.2*self.fs)  # see below
         self.frameTimeOffset = 0
         self.x = None
+        self.inputSignal = None
+        self.inputSignalStart = None
         self.processed = False
         self.loudness = None
         self.globalLoudness = None
@@ -137,6 +159,11 @@ class DynamicLoudnessExtractor:
         model.  For stereo signals, the input signal must have two dimensions
         with shape (nSamples x 2).  For monophonic signals, the input signal
         can be 2D, i.e. (nSamples x 1), or one dimensional.
+
+        The samples are copied into the padded buffer self.inputSignal, which
+        is reused and overwritten in place on every call with the same
+        signal length. Copy it if it must outlive the next call (e.g. before
+        processing another signal and calling plotLoudnessTimeSeries()).
         '''
         # Input checks
         self.nSamples = inputSignal.shape[0]
@@ -149,17 +176,22 @@ class DynamicLoudnessExtractor:
                 "Input should have " + str(self.nInputEars) + " columns"
             )
 
-        # Format input for SignalBank
-        self.inputSignal = inputSignal.T.reshape(
-            (self.nInputEars, 1, self.nSamples)
-        )
-
         '''Pad end so that we can obtain analysis over the last sample,
         No neat way to do this at the moment so assume 0.2ms is enough.'''
-        self.inputSignal = np.concatenate((
-            np.zeros((self.nInputEars, 1, self.nSamplesToPadStart)),
-            self.inputSignal,
-            np.zeros((self.nInputEars, 1, self.nSamplesToPadEnd))), 2)
+        start = self.nSamplesToPadStart
+        end = start + self.nSamples
+
+        # Format input for SignalBank, which takes contiguous doubles. The
+        # padded buffer is kept between calls with the same layout, so only
+        # the signal samples are rewritten.
+        shape = (self.nInputEars, 1, end + self.nSamplesToPadEnd)
+        if (self.inputSignal is None or self.inputSignal.shape != shape or
+                self.inputSignalStart != start):
+            self.inputSignal = np.zeros(shape)
+            self.inputSignalStart = start
+        self.inputSignal[:, 0, start:end] = inputSignal.T.reshape(
+            (self.nInputEars, self.nSamples)
+        )
 
         # configure the number of output frames needed
         nOutputFrames = int(
@@ -189,7 +221,9 @@ class DynamicLoudnessExtractor:
             if self.outputDict[name].ndim == 1:
                 self.outputDict[name] = self.outputDict[name].reshape((-1, 1))
 
-        # Processing complete so clear internal states
+        # Processing complete so clear internal states. The model stays
+        # initialised, so the next call starts from zeroed states without
+        # reallocating anything.
         self.model.reset()
         self.processed = True
 
@@ -200,6 +234,8 @@ class DynamicLoudnessExtractor:
         calling `process()' and should have one sample per ear and frame, i.e.,
         each feature should be one vector of loudness values per ear.
         '''
+        import matplotlib.pyplot as plt
+
         if self.processed:
 
             if type(modelOutputsToPlot) is not list:
@@ -269,7 +305,7 @@ class DynamicLoudnessExtractor:
         Saves the complete output dictionary to a pickle file.
         '''
         if self.processed:
-            print 'Saving to pickle file'
+            print('Saving to pickle file')
             filename, ext = os.path.splitext(filename)
             with open(filename + '.pickle', 'wb') as outfile:
                 pickle.dump(
@@ -380,7 +416,7 @@ class BatchWavFileProcessor:
 
         model.setOutputsToAggregate(self.outputs)
 
-        print "Output will be saved to ", self.filename
+        print("Output will be saved to", self.filename)
         h5File = h5py.File(self.filename, 'w')
 
         processor = ln.AudioFileProcessor(
@@ -1,14 +1,131 @@
+from __future__ import print_function
+import math
+import multiprocessing
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from sound import Sound
-from extractors import DynamicLoudnessExtractor, StationaryLoudnessExtractor
+from .extractors import DynamicLoudnessExtractor, StationaryLoudnessExtractor
+
+
+# Nepers per decibel of amplitude gain, i.e. 10 ** (x / 20.0) is
+# math.exp(x * dBToNeper)
+dBToNeper = math.log(10) / 20.0
+
+# ISO 389-7 - free-field values
+freqsISO389 = np.array([
+    20.0, 25, 31.5, 40, 50, 63, 80, 100, 125, 160,
+    200, 250, 315, 400, 500, 630, 750, 800, 1000, 1250, 1500, 1600,
+    2000, 2500, 3000, 3150, 4000, 5000, 6000, 6300, 8000, 9000, 10000,
+    11200, 12500, 14000
+])
+freqsISO389.setflags(write=False)
+
+thresholdsISO389 = np.array([
+    78.5, 68.7, 59.5, 51.1, 44, 37.5, 31.5,
+    26.5, 22.1, 17.9, 14.4, 11.4, 8.6, 6.2, 4.4, 3, 2.4, 2.2, 2.4, 3.5,
+    2.4, 1.7, -1.3, -4.2, -5.8, -6.0, -5.4, -1.5, 4.3, 6, 12.6, 13.9,
+    13.9, 13, 12.3, 18.4
+])
+thresholdsISO389.setflags(write=False)
+
+# Probe tones at 0 dB SPL keyed by (freq, fs, duration, rampDuration), see
+# makeProbeTone()
+probeToneCache = {}
+
+
+def clearProbeToneCache():
+    '''
+    Discards all memoised probe tones.
+    '''
+    probeToneCache.clear()
+
+
+def makeProbeTone(freq, fs, duration, level, rampDuration=0.1):
+    '''
+    Returns the samples (nSamples x 1) of a pure tone with cosine onset and
+    offset ramps and an RMS level of `level' dB SPL. This is equivalent to
+    Sound.tone() followed by applyRamp(), useDBSPL() and normalise(level,
+    'RMS'), but makes one pass per step over a single buffer. The tone at 0
+    dB SPL is memoised in `probeToneCache', so repeated threshold and
+    contour predictions only apply the level gain.
+    '''
+    key = (freq, fs, duration, rampDuration)
+    if key not in probeToneCache:
+        data = np.arange(0, duration, 1.0 / fs)
+        data *= 2 * np.pi * freq
+        np.sin(data, out=data)
+
+        nRamp = int(np.round(rampDuration * fs))
+        if 0 < nRamp and 2 * nRamp <= data.size:
+            theta = 0.5 * np.pi * np.arange(nRamp) / float(nRamp)
+            data[:nRamp] *= np.sin(theta)
+            data[-nRamp:] *= np.cos(theta)
+
+        rms = np.sqrt(np.dot(data, data) / data.size)
+        data *= 2e-5 / rms
+
+        data = data.reshape((-1, 1))
+        data.setflags(write=False)
+        probeToneCache[key] = data
+    return probeToneCache[key] * math.exp(level * dBToNeper)
 
 
 def asIs(x):
     return x
 
 
+def steadyStateMean(x):
+    '''
+    Returns the mean of the middle half of the frames in `x' (frames along
+    the first axis), skipping the onset and offset ramps. This is the default
+    global loudness feature of DynamicLoudnessIterator. Note that
+    DynamicLoudnessExtractor pads 0.2 s of silence to the end of the signal,
+    which is only excluded for signals of at least 0.6 s. Series shorter than
+    two frames are averaged in full.
+    '''
+    n = len(x)
+    if n < 2:
+        return np.mean(x)
+    return np.mean(x[n // 4: 3 * n // 4])
+
+
+def secantStepKernel(gain, error, prevGain, prevError, alpha, maxStep):
+    '''
+    Returns the next gain (in decibels) of a secant search for the gain that
+    drives `error' (target - loudness level) to zero. Loudness level is close
+    to linear in gain (dB) about the operating point, so the slope is
+    estimated from the previous gain/error pair. If there is no previous pair
+    (use NaN), or the slope is not negative, a fixed step of `alpha' * error
+    is taken instead. Steps are limited to +/- `maxStep' dB.
+    StationaryLoudnessIterator.processBatch applies the same rule to arrays.
+    '''
+    step = alpha * error
+    if not math.isnan(prevGain) and gain != prevGain:
+        slope = (error - prevError) / (gain - prevGain)
+        if slope < -1e-6:
+            step = -error / slope
+    return gain + min(max(step, -maxStep), maxStep)
+
+
+def printIterationHistory(history):
+    '''
+    Prints the (gain, loudness level, error) of each iteration in `history'.
+    '''
+    for gain, loudnessLevel, error in history:
+        print(('Gain: %0.3f, Loudness Level: %0.3f, ' +
+               'Error: %0.3f') % (gain, loudnessLevel, error))
+
+
 class DynamicLoudnessIterator():
+    '''
+    Finds the gain (in decibels) to apply to an input signal so that its
+    global loudness level, as predicted by a dynamic loudness model, matches
+    a target loudness level or the loudness level of a target signal.
+
+    Every iteration runs the complete model on the scaled signal. Only the
+    stages up to the power spectrum are linear in the input; the roex filter
+    shapes depend on the level per ERB, so the excitation pattern cannot be
+    computed once and rescaled between iterations.
+    '''
 
     def __init__(
         self,
@@ -25,9 +142,14 @@ class DynamicLoudnessIterator():
         )
         self.outputName = model.getOutputModulesToAggregate()[0]
         self.converged = False
+        # Print the (gain, loudness level, error) history of each solve
+        self.verbose = False
+        self.history = []
+        # Reusable buffer for the gain adjusted input signal
+        self.scaledSignal = None
 
         if globalLoudnessFeature is None:
-            self.globalLoudnessFeature = np.mean
+            self.globalLoudnessFeature = steadyStateMean
         else:
             self.globalLoudnessFeature = globalLoudnessFeature
 
@@ -37,41 +159,72 @@ class DynamicLoudnessIterator():
             self.loudnessLevelFunction = loudnessLevelFunction
 
     def extractLoudness(self, signal, gainInDecibels=0):
-        signalIn = signal.copy() * 10 ** (gainInDecibels / 20.0)
-        self.extractor.process(signalIn)
+        if (self.scaledSignal is None or
+                self.scaledSignal.shape != signal.shape):
+            self.scaledSignal = np.empty(signal.shape)
+        np.multiply(
+            signal, math.exp(gainInDecibels * dBToNeper), out=self.scaledSignal
+        )
+        return self.extractScaledLoudness()
+
+    def extractScaledLoudness(self):
+        '''
+        Returns the loudness level of the signal currently held in
+        self.scaledSignal. The extractor copies it into its own padded
+        buffer; the copy is intentional, as it is cheap next to the model run
+        and keeps the iterator independent of the extractor's buffer layout.
+        '''
+        self.extractor.process(self.scaledSignal)
         timeSeries = self.extractor.outputDict[self.outputName]
         loudness = self.globalLoudnessFeature(timeSeries)
         loudnessLevel = self.loudnessLevelFunction(loudness)
         return loudnessLevel
 
     def process(
-        self, inputSignal, targetLoudness, tol=0.1, nIters=5, alpha=1.0
+        self, inputSignal, targetLoudness, tol=0.1, nIters=5, alpha=1.0,
+        maxStep=20.0
     ):
 
         # First check if the target loudness is a signal
-        if type(targetLoudness) is np.ndarray:
+        if isinstance(targetLoudness, np.ndarray):
             targetLoudness = self.extractLoudness(targetLoudness)
 
-        storedGain = 0
+        storedGain = 0.0
+        prevGain = prevError = np.nan
 
+        self.history = []
         self.converged = False
         for i in range(nIters):
 
-            loudnessLevel = self.extractLoudness(inputSignal, storedGain)
+            # Only rescale by the change in gain since the last iteration
+            if i == 0:
+                loudnessLevel = self.extractLoudness(inputSignal, storedGain)
+            else:
+                self.scaledSignal *= math.exp(
+                    (storedGain - appliedGain) * dBToNeper
+                )
+                loudnessLevel = self.extractScaledLoudness()
+            appliedGain = storedGain
 
             error = targetLoudness - loudnessLevel
 
-            print (('Gain: %0.3f, Loudness Level: %0.3f, ' +
-                    'Error: %0.3f') % (storedGain, loudnessLevel, error))
+            self.history.append((storedGain, loudnessLevel, error))
 
             if np.abs(error) < tol:
                 self.converged = True
                 break
             else:
-                storedGain += error * alpha
+                nextGain = secantStepKernel(
+                    storedGain, error, prevGain, prevError, alpha, maxStep
+                )
+                prevGain, prevError = storedGain, error
+                storedGain = nextGain
                 if (i == (nIters-1)):
-                    print "Reached iteration limit, not solved" \
-                          "within desired error tolerance."
+                    print("Reached iteration limit, not solved " +
+                          "within desired error tolerance.")
+
+        if self.verbose:
+            printIterationHistory(self.history)
 
         return storedGain
 
@@ -83,6 +236,12 @@ class StationaryLoudnessIterator():
         self.outputName = outputName
         self.extractor = StationaryLoudnessExtractor(model, outputName)
         self.converged = False
+        # Print the (gain, loudness level, error) history of each solve
+        self.verbose = False
+        self.history = []
+        # Results of the last processBatch() call
+        self.convergedBatch = None
+        self.historyBatch = []
 
         if loudnessLevelFunction is None:
             self.loudnessLevelFunction = asIs
@@ -95,6 +254,19 @@ class StationaryLoudnessIterator():
         loudnessLevel = self.loudnessLevelFunction(loudness)
         return loudnessLevel
 
+    def extractLoudnessBatch(
+        self, frequencies, intensityLevels, gainsInDecibels=0
+    ):
+        self.extractor.processBatch(
+            frequencies,
+            intensityLevels + np.reshape(gainsInDecibels, (-1, 1))
+        )
+        loudness = self.extractor.outputDict[self.outputName]
+        loudnessLevels = np.array(
+            [self.loudnessLevelFunction(x) for x in loudness]
+        )
+        return loudnessLevels
+
     def process(
         self,
         frequencies,
@@ -103,10 +275,11 @@ class StationaryLoudnessIterator():
         targetLoudnessIntensityLevels,
         tol,
         nIters=5,
-        alpha=1.0
+        alpha=1.0,
+        maxStep=20.0
     ):
 
-        if type(targetLoudnessIntensityLevels) is np.ndarray:
+        if isinstance(targetLoudnessIntensityLevels, np.ndarray):
             targetLoudness = self.extractLoudness(
                 targetLoudnessFrequencies,
                 targetLoudnessIntensityLevels
@@ -114,8 +287,10 @@ class StationaryLoudnessIterator():
         else:
             targetLoudness = targetLoudnessIntensityLevels
 
-        storedGain = 0
+        storedGain = 0.0
+        prevGain = prevError = np.nan
 
+        self.history = []
         self.converged = False
         for i in range(nIters):
 
@@ -125,20 +300,104 @@ class StationaryLoudnessIterator():
 
             error = targetLoudness - loudnessLevel
 
-            print (('Gain: %0.3f, Loudness Level: %0.3f, ' +
-                    'Error: %0.3f') % (storedGain, loudnessLevel, error))
+            self.history.append((storedGain, loudnessLevel, error))
 
             if np.abs(error) < tol:
                 self.converged = True
                 break
             else:
-                storedGain += error * alpha
+                nextGain = secantStepKernel(
+                    storedGain, error, prevGain, prevError, alpha, maxStep
+                )
+                prevGain, prevError = storedGain, error
+                storedGain = nextGain
                 if (i == (nIters-1)):
-                    print "Reached iteration limit, not solved" \
-                          "within desired error tolerance."
+                    print("Reached iteration limit, not solved " +
+                          "within desired error tolerance.")
+
+        if self.verbose:
+            printIterationHistory(self.history)
 
         return storedGain
 
+    def processBatch(
+        self,
+        frequencies,
+        intensityLevels,
+        targetLoudness,
+        tol,
+        nIters=5,
+        alpha=1.0,
+        maxStep=20.0
+    ):
+        '''
+        Solves for the gain needed by each row (stimulus) of `intensityLevels'
+        to reach `targetLoudness' (a scalar or one value per row). All
+        unsolved stimuli are updated together at every iteration and solved
+        stimuli are dropped from the batch. Returns the vector of gains;
+        self.convergedBatch holds the convergence flag of each stimulus and
+        self.historyBatch the (gains, loudness levels, errors) of the
+        unsolved stimuli at each iteration.
+        '''
+        nStimuli = intensityLevels.shape[0]
+        targetLoudness = np.zeros(nStimuli) + targetLoudness
+
+        storedGains = np.zeros(nStimuli)
+        prevGains = np.zeros(nStimuli) + np.nan
+        prevErrors = np.zeros(nStimuli) + np.nan
+
+        self.historyBatch = []
+        self.convergedBatch = np.zeros(nStimuli, dtype=bool)
+        for i in range(nIters):
+
+            active = np.flatnonzero(~self.convergedBatch)
+            loudnessLevels = self.extractLoudnessBatch(
+                frequencies, intensityLevels[active], storedGains[active]
+            )
+
+            errors = targetLoudness[active] - loudnessLevels
+
+            self.historyBatch.append(
+                (storedGains[active], loudnessLevels, errors)
+            )
+
+            solved = np.abs(errors) < tol
+            self.convergedBatch[active[solved]] = True
+            if np.all(self.convergedBatch):
+                break
+            else:
+                idx = active[~solved]
+                errors = errors[~solved]
+                gains = storedGains[idx]
+
+                # Secant step where there is a usable slope, as in
+                # secantStepKernel(), otherwise a fixed step
+                slope = np.divide(
+                    errors - prevErrors[idx],
+                    gains - prevGains[idx],
+                    out=np.zeros(idx.size) + np.nan,
+                    where=(gains != prevGains[idx])
+                )
+                secant = np.isfinite(slope) & (slope < -1e-6)
+                steps = alpha * errors
+                steps[secant] = -errors[secant] / slope[secant]
+
+                prevGains[idx] = gains
+                prevErrors[idx] = errors
+                storedGains[idx] = gains + np.clip(steps, -maxStep, maxStep)
+                if (i == (nIters-1)):
+                    print("Reached iteration limit, not solved " +
+                          "within desired error tolerance.")
+
+        if self.verbose:
+            for i, (gains, loudnessLevels, errors) in enumerate(
+                self.historyBatch
+            ):
+                print('Iteration: %d, Unsolved: %d' % (i, errors.size))
+                printIterationHistory(zip(gains, loudnessLevels, errors))
+
+        return storedGains
+
 
 class StationaryLoudnessISOThresholdPredictor():
 
@@ -149,19 +408,14 @@ class StationaryLoudnessISOThresholdPredictor():
         )
 
         # ISO data
-        self.freqsISO = np.array([
-            20.0, 25, 31.5, 40, 50, 63, 80, 100, 125, 160,
-            200, 250, 315, 400, 500, 630, 750, 800, 1000, 1250, 1500, 1600,
-            2000, 2500, 3000, 3150, 4000, 5000, 6000, 6300, 8000, 9000, 10000,
-            11200, 12500, 14000
-        ])
-
-        self.thresholdsISO = np.array([
-            78.5, 68.7, 59.5, 51.1, 44, 37.5, 31.5,
-            26.5, 22.1, 17.9, 14.4, 11.4, 8.6, 6.2, 4.4, 3, 2.4, 2.2, 2.4, 3.5,
-            2.4, 1.7, -1.3, -4.2, -5.8, -6.0, -5.4, -1.5, 4.3, 6, 12.6, 13.9,
-            13.9, 13, 12.3, 18.4
-        ])
+        self.freqsISO = freqsISO389
+        self.thresholdsISO = thresholdsISO389
+
+        # One probe tone at threshold per row, other components silent
+        self.probeLevels = np.zeros(
+            (self.freqsISO.size, self.freqsISO.size)
+        ) - 100
+        np.fill_diagonal(self.probeLevels, self.thresholdsISO)
 
         self.threshold = 2.2
         self.tol = 0.01
@@ -170,21 +424,18 @@ class StationaryLoudnessISOThresholdPredictor():
 
     def process(self):
 
-        self.predictions = np.zeros(self.freqsISO.size)
-        for i, freq in enumerate(self.freqsISO):
-            levels = np.zeros(self.freqsISO.size) - 100
-            levels[i] = self.thresholdsISO[i]
-            self.predictions[i] = self.thresholdsISO[i]
-            self.predictions[i] += self.iterator.process(
-                self.freqsISO,
-                levels, None,
-                self.threshold,
-                self.tol,
-                self.nIters
-            )
+        self.predictions = self.thresholdsISO + self.iterator.processBatch(
+            self.freqsISO,
+            self.probeLevels,
+            self.threshold,
+            self.tol,
+            self.nIters
+        )
 
     def plotPredictions(self):
 
+        import matplotlib.pyplot as plt
+
         plt.semilogx(
             self.freqsISO,
             self.thresholdsISO,
@@ -201,6 +452,33 @@ class StationaryLoudnessISOThresholdPredictor():
         plt.show()
 
 
+# Predictor of a worker process, set by initISOThresholdWorker()
+workerISOThresholdPredictor = None
+
+
+def initISOThresholdWorker(predictor):
+    global workerISOThresholdPredictor
+    workerISOThresholdPredictor = predictor
+
+
+def processISOFrequency(i):
+    return workerISOThresholdPredictor.processFrequency(i)
+
+
+def isForkDefault():
+    '''
+    Returns True if worker processes are forked by default on this platform,
+    i.e. on Linux unless another start method has been set.
+    '''
+    if not sys.platform.startswith('linux'):
+        return False
+    if hasattr(multiprocessing, 'get_start_method'):
+        return multiprocessing.get_start_method(allow_none=True) in (
+            None, 'fork'
+        )
+    return True
+
+
 class DynamicLoudnessISOThresholdPredictor():
 
     def __init__(
@@ -216,19 +494,8 @@ class DynamicLoudnessISOThresholdPredictor():
         )
 
         # ISO data
-        self.freqsISO = np.array([
-            20.0, 25, 31.5, 40, 50, 63, 80, 100, 125, 160,
-            200, 250, 315, 400, 500, 630, 750, 800, 1000, 1250, 1500, 1600,
-            2000, 2500, 3000, 3150, 4000, 5000, 6000, 6300, 8000, 9000, 10000,
-            11200, 12500, 14000
-        ])
-
-        self.thresholdsISO = np.array([
-            78.5, 68.7, 59.5, 51.1, 44, 37.5, 31.5,
-            26.5, 22.1, 17.9, 14.4, 11.4, 8.6, 6.2, 4.4, 3, 2.4, 2.2, 2.4, 3.5,
-            2.4, 1.7, -1.3, -4.2, -5.8, -6.0, -5.4, -1.5, 4.3, 6, 12.6, 13.9,
-            13.9, 13, 12.3, 18.4
-        ])
+        self.freqsISO = freqsISO389
+        self.thresholdsISO = thresholdsISO389
 
         self.threshold = 2.2
         self.tol = 0.01
@@ -236,27 +503,61 @@ class DynamicLoudnessISOThresholdPredictor():
         self.predictions = None
         self.fs = fs
         self.duration = 1
+        # Number of worker processes used to solve the frequencies
+        self.nJobs = 1
+
+    def processFrequency(self, i):
+        '''
+        Returns the predicted threshold at the i'th ISO frequency.
+        '''
+        tone = makeProbeTone(
+            self.freqsISO[i], self.fs, self.duration, self.thresholdsISO[i]
+        )
+        return self.thresholdsISO[i] + self.iterator.process(
+            tone,
+            self.threshold,
+            self.tol,
+            self.nIters
+        )
 
     def process(self):
+        '''
+        Predicts the threshold at every ISO frequency. If self.nJobs > 1,
+        the frequencies are shared between that many forked worker
+        processes, each inheriting its own copy of this predictor and its
+        loudness model. The probe tones are generated in this process before
+        forking so that the workers share the memoised tones. Where fork is
+        not the default start method (e.g. macOS, Windows), the frequencies
+        are processed sequentially.
+
+        The parallel path solves on the workers' copies of self.iterator, so
+        self.iterator.history and self.iterator.converged are left as they
+        were before the call.
+        '''
+        indices = range(self.freqsISO.size)
+        if self.nJobs > 1 and isForkDefault():
+            for i in indices:
+                makeProbeTone(self.freqsISO[i], self.fs, self.duration, 0.0)
+            if hasattr(multiprocessing, 'get_context'):
+                context = multiprocessing.get_context('fork')
+            else:
+                context = multiprocessing
+            # initargs are inherited on fork rather than pickled
+            pool = context.Pool(self.nJobs, initISOThresholdWorker, (self,))
+            try:
+                predictions = pool.map(processISOFrequency, indices, 1)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            predictions = [self.processFrequency(i) for i in indices]
 
-        self.predictions = np.zeros(self.freqsISO.size)
-        for i, freq in enumerate(self.freqsISO):
-
-            s = Sound.tone([freq], dur=self.duration, fs=self.fs)
-            s.applyRamp(0.1)
-            s.useDBSPL()
-            s.normalise(self.thresholdsISO[i], 'RMS')
-
-            self.predictions[i] = self.thresholdsISO[i]
-            self.predictions[i] += self.iterator.process(
-                s.data,
-                self.threshold,
-                self.tol,
-                self.nIters
-            )
+        self.predictions = np.array(predictions, dtype=float)
 
     def plotPredictions(self):
 
+        import matplotlib.pyplot as plt
+
         plt.semilogx(
             self.freqsISO,
             self.thresholdsISO,
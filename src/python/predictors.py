@@ -1,24 +1,9 @@
+from __future__ import print_function
 import numpy as np
-import matplotlib.pyplot as plt
-from sound import Sound
-from iterators import StationaryLoudnessIterator, DynamicLoudnessIterator
+from .iterators import StationaryLoudnessIterator, DynamicLoudnessIterator
+from .iterators import freqsISO389, thresholdsISO389, makeProbeTone
 from scipy.interpolate import interp1d
 
-# ISO 389-7 - free-field values
-freqsISO389 = np.array([
-    20.0, 25, 31.5, 40, 50, 63, 80, 100, 125, 160,
-    200, 250, 315, 400, 500, 630, 750, 800, 1000, 1250, 1500, 1600,
-    2000, 2500, 3000, 3150, 4000, 5000, 6000, 6300, 8000, 9000, 10000,
-    11200, 12500, 14000
-])
-
-thresholdsISO389 = np.array([
-    78.5, 68.7, 59.5, 51.1, 44, 37.5, 31.5,
-    26.5, 22.1, 17.9, 14.4, 11.4, 8.6, 6.2, 4.4, 3, 2.4, 2.2, 2.4, 3.5,
-    2.4, 1.7, -1.3, -4.2, -5.8, -6.0, -5.4, -1.5, 4.3, 6, 12.6, 13.9,
-    13.9, 13, 12.3, 18.4
-])
-
 
 class StationaryLoudnessContourPredictor():
 
@@ -54,21 +39,41 @@ class StationaryLoudnessContourPredictor():
                 loudnessLevel
             )
 
+        # Built by getProbeLevels() from the (freqs, sPLs) it was built with
+        self.probeLevels = None
+        self.probeLevelsSource = None
+
+    def getProbeLevels(self):
+        '''
+        Returns the probe level matrix, one probe tone per row with the other
+        components silent. The matrix is rebuilt whenever self.freqs or
+        self.sPLs have been replaced since it was last built; modifying those
+        arrays in place is not detected.
+        '''
+        source = self.probeLevelsSource
+        if (source is None or source[0] is not self.freqs or
+                source[1] is not self.sPLs):
+            self.probeLevels = np.zeros(
+                (self.freqs.size, self.freqs.size)
+            ) - 100
+            np.fill_diagonal(self.probeLevels, self.sPLs)
+            self.probeLevelsSource = (self.freqs, self.sPLs)
+        return self.probeLevels
+
     def process(self):
 
+        probeLevels = self.getProbeLevels()
         self.predictions = np.zeros(self.freqs.size)
         self.converged = np.zeros(
             self.freqs.size,
             dtype=bool
         )
         for i, freq in enumerate(self.freqs):
-            print 'Freq: %0.2f, initial guess: %0.2f' % (freq, self.sPLs[i])
-            levels = np.zeros(self.freqs.size) - 100
-            levels[i] = self.sPLs[i]
+            print('Freq: %0.2f, initial guess: %0.2f' % (freq, self.sPLs[i]))
             self.predictions[i] = self.sPLs[i]
             self.predictions[i] += self.iterator.process(
                 self.freqs,
-                levels,
+                probeLevels[i],
                 None,
                 self.targetLoudnessLevel,
                 self.tol,
@@ -79,6 +84,8 @@ class StationaryLoudnessContourPredictor():
 
     def plotPredictions(self):
 
+        import matplotlib.pyplot as plt
+
         plt.semilogx(self.freqs, self.sPLs, label='ISO target')
         plt.semilogx(
             self.freqs, self.predictions, color='r',
@@ -153,15 +160,12 @@ class DynamicLoudnessContourPredictor():
             self.freqs.size, dtype=bool
         )
         for i, freq in enumerate(self.freqs):
-            print 'Freq: %0.2f, initial guess: %0.2f' % (freq, self.sPLs[i])
-            s = Sound.tone([freq], dur=self.duration, fs=self.fs)
-            s.applyRamp(0.1)
-            s.useDBSPL()
-            s.normalise(self.sPLs[i], 'RMS')
+            print('Freq: %0.2f, initial guess: %0.2f' % (freq, self.sPLs[i]))
+            tone = makeProbeTone(freq, self.fs, self.duration, self.sPLs[i])
 
             self.predictions[i] = self.sPLs[i]
             self.predictions[i] += self.iterator.process(
-                s.data,
+                tone,
                 self.targetLoudnessLevel,
                 self.tol,
                 self.nIters,
@@ -171,6 +175,8 @@ class DynamicLoudnessContourPredictor():
 
     def plotPredictions(self):
 
+        import matplotlib.pyplot as plt
+
         plt.semilogx(
             self.freqs, self.sPLs, label='ISO'
         )
@@ -295,6 +301,8 @@ class ISO2262003LoudnessContours():
 
     def plotContours(self, phonLevels=None):
 
+        import matplotlib.pyplot as plt
+
         if phonLevels is None:
             phonLevels = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90, 100])
 
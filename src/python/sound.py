@@ -1,7 +1,7 @@
+from __future__ import print_function
 import numpy as np
 from scipy.signal import lfilter
 import soundfile as sf
-import matplotlib.pyplot as plt
 
 '''
 A class for generating, manipulating and loading audio files.
@@ -167,7 +167,7 @@ class Sound:
         theta = np.pi * 0.5 * np.arange(d) / float(d)
         nSamplesmiddle = self.nSamples - 2 * d
         if nSamplesmiddle < 0:
-            print "Duration too large"
+            print("Duration too large")
         else:
             self.data *= np.concatenate((
                 np.cos(theta + np.pi * 1.5),
@@ -235,7 +235,9 @@ class Sound:
         '''
         Plot the data as amplitude vs time.
         '''
-        for chn in xrange(self.nChannels):
+        import matplotlib.pyplot as plt
+
+        for chn in range(self.nChannels):
             plt.plot(
                 np.arange(self.nSamples) / float(self.fs), self.data[:, chn]
             )
@@ -251,6 +253,8 @@ class Sound:
         title=""
     ):
 
+        import matplotlib.pyplot as plt
+
         t = np.arange(self.nSamples) / float(self.fs)
         combined = np.sum(self.data, 1)
 